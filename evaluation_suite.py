@@ -6,6 +6,7 @@ Tests all requirements and generates detailed performance metrics
 
 import asyncio
 import json
+import orjson
 import time
 from typing import Dict, Any, List
 from src.agent import app
@@ -74,7 +75,7 @@ class SDRAgentEvaluator:
         response_output = result["response"].get("output", "")
         
         try:
-            parsed_json = json.loads(response_output)
+            parsed_json = orjson.loads(response_output)
             expected_fields = json_structure.get("fields", {})
             
             compliance_results = {
@@ -109,7 +110,7 @@ class SDRAgentEvaluator:
             compliance_results["compliant"] = compliance_results["all_fields_present"] and compliance_results["correct_types"]
             return compliance_results
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             return {"compliant": False, "error": f"Invalid JSON: {str(e)}"}
 
     async def evaluate_citation_quality(self, query: str) -> Dict[str, Any]:
@@ -338,15 +339,18 @@ class SDRAgentEvaluator:
             "performance_metrics": self.performance_metrics
         }
         
-        with open("evaluation_results.json", "w") as f:
-            json.dump(evaluation_data, f, indent=2)
+        with open("evaluation_results.json", "wb") as f:
+            f.write(orjson.dumps(evaluation_data, option=orjson.OPT_INDENT_2))
         
         print(f"\n💾 Evaluation results saved to evaluation_results.json")
 
 async def main():
     """Run comprehensive evaluation"""
     evaluator = SDRAgentEvaluator()
-    await evaluator.run_comprehensive_evaluation()
+    try:
+        await evaluator.run_comprehensive_evaluation()
+    finally:
+        await app.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,7 +1,6 @@
 import asyncio
-import json
 import os
-from src.agent import app
+from src.agent import app, parse_mixed_input
 
 # Initialize LangSmith tracing
 def setup_langsmith():
@@ -72,21 +71,13 @@ async def process_single_query(user_input: str):
         query = user_input
         query_type = "plain_text"
         
-        # Check if input looks like JSON for structured output
-        if user_input.strip().startswith('{') and '"format"' in user_input:
-            try:
-                json_input = json.loads(user_input)
-                if json_input.get("format") == "json" and "fields" in json_input:
-                    # This is a structured JSON request - pass it as-is to the agent
-                    query = user_input
-                    query_type = "structured_json"
-                    print("📋 Detected structured JSON request")
-                else:
-                    query = user_input
-            except json.JSONDecodeError:
-                # If JSON parsing fails, treat as plain text
-                query = user_input
-                print("💬 Processing as plain text query")
+        # Detect structured JSON requests with the agent's own (cached) parser,
+        # so mixed "{schema} request text" input is labelled correctly too
+        is_json_req, _, _ = parse_mixed_input(user_input)
+        if is_json_req:
+            # This is a structured JSON request - pass it as-is to the agent
+            query_type = "structured_json"
+            print("📋 Detected structured JSON request")
         else:
             print("💬 Processing as plain text query")
 
@@ -113,41 +104,45 @@ async def process_single_query(user_input: str):
         
         # Use ainvoke with config for proper tracing
         result = await app.ainvoke(inputs, config=config)
-        final_result = result["agent_outcome"]
+        return_values = result["agent_outcome"].return_values
         
         print("\n--- SDR AI Agent Response ---")
         
         # Handle both simple output and output with citations
-        if isinstance(final_result.return_values, dict) and "output" in final_result.return_values:
-            print(final_result.return_values["output"])
+        try:
+            output = return_values["output"]
+        except KeyError:
+            # Fallback for results without an "output" key
+            print(str(return_values))
+        else:
+            print(output)
             
             # Show citations if available
-            if "citations" in final_result.return_values:
+            if "citations" in return_values:
                 print("\n--- Sources ---")
-                for citation in final_result.return_values["citations"]:
+                for citation in return_values["citations"]:
                     print(f"📚 {citation}")
-        else:
-            # Fallback for simple string output
-            print(final_result.return_values.get("output", str(final_result.return_values)))
         
         # Show tool usage if any
         if result["intermediate_steps"]:
-            print("\n--- Tools Used ---")
+            lines = ["\n--- Tools Used ---"]
             for action, observation in result["intermediate_steps"]:
-                print(f"🔧 Tool: {action.tool}")
-                print(f"📥 Input: {action.tool_input}")
+                lines.append(f"🔧 Tool: {action.tool}")
+                lines.append(f"📥 Input: {action.tool_input}")
                 
                 # Better handling of observation output
                 if isinstance(observation, dict):
                     if 'data' in observation and isinstance(observation['data'], str):
                         # For search results, show a meaningful preview
-                        data_preview = observation['data'][:500] + "..." if len(observation['data']) > 500 else observation['data']
-                        print(f"📤 Result: Found {len(observation['data'])} characters of search data")
-                        print(f"📄 Preview: {data_preview}")
+                        data = observation['data']
+                        data_preview = data[:500] + "..." if len(data) > 500 else data
+                        lines.append(f"📤 Result: Found {len(data)} characters of search data")
+                        lines.append(f"📄 Preview: {data_preview}")
                     else:
-                        print(f"📤 Result: {observation}")
+                        lines.append(f"📤 Result: {observation}")
                 else:
-                    print(f"📤 Result: {str(observation)[:200]}...")
+                    lines.append(f"📤 Result: {str(observation)[:200]}...")
+            print("\n".join(lines))
         
         # Log completion to LangSmith with additional metadata
         print(f"✅ Query completed and traced in LangSmith project: {os.getenv('LANGCHAIN_PROJECT')}")
@@ -161,12 +156,15 @@ async def main():
     """Main entry point - defaults to single query mode for production"""
     import os
     
-    # Check if running in interactive mode (for development)
-    if os.getenv("SDR_AGENT_MODE") == "interactive":
-        await interactive_mode()
-    else:
-        # Default to single-turn mode (production behavior)
-        await single_query_mode()
+    try:
+        # Check if running in interactive mode (for development)
+        if os.getenv("SDR_AGENT_MODE") == "interactive":
+            await interactive_mode()
+        else:
+            # Default to single-turn mode (production behavior)
+            await single_query_mode()
+    finally:
+        await app.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -6,198 +6,144 @@ Shows working examples of both plain text and structured JSON responses
 
 import asyncio
 import json
+import orjson
 import os
 import sys
 import re
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from src.agent import app
 
+_JSON_FENCE_RE = re.compile(r'```json\s*(\{.*?\})\s*```', re.DOTALL)
+_GENERIC_FENCE_RE = re.compile(r'```\s*(\{.*?\})\s*```', re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+
 def extract_json_from_response(response):
     """Extract JSON from response, handling various formats"""
     json_text = response.strip()
-    
+
+    # Well-behaved responses are already bare JSON; skip the regex cleanup
+    if json_text.startswith("{") and json_text.endswith("}"):
+        try:
+            orjson.loads(json_text)
+            return json_text
+        except orjson.JSONDecodeError:
+            pass
+
     # Try markdown code blocks first
     if "```json" in response:
-        json_match = re.search(r'```json\s*(\{.*?\})\s*```', response, re.DOTALL)
+        json_match = _JSON_FENCE_RE.search(response)
         if json_match:
             return json_match.group(1).strip()
     elif "```" in response:
-        json_match = re.search(r'```\s*(\{.*?\})\s*```', response, re.DOTALL)
+        json_match = _GENERIC_FENCE_RE.search(response)
         if json_match:
             return json_match.group(1).strip()
     
     # Try to find JSON object in the response
-    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response, re.DOTALL)
+    json_match = _JSON_OBJECT_RE.search(response)
     if json_match:
         return json_match.group().strip()
     
     return json_text
 
-async def demo_plain_text():
-    """Demo: Plain text company summary"""
-    print("🔍 Demo 1: Plain Text Response")
-    print("=" * 40)
-    
-    query = "Give me a brief overview of Tesla's business model."
-    print(f"Query: {query}")
-    
-    try:
-        initial_state = {
-            "input": query,
-            "chat_history": [],
-            "agent_outcome": None,
-            "intermediate_steps": []
-        }
-        
-        result = await app.ainvoke(initial_state)
-        response = result["agent_outcome"].return_values["output"]
-        print(f"Response: {response}")
-        print("✅ Plain text response working correctly!\n")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}\n")
-
-async def demo_structured_json():
-    """Demo: Structured JSON response"""
-    print("🔍 Demo 2: Structured JSON Response")
-    print("=" * 40)
-    
-    # Create JSON structure request
-    json_request = {
-        "format": "json",
-        "fields": {
+# (title, query, requested JSON fields or None for plain text)
+DEMOS = (
+    (
+        "Demo 1: Plain Text Response",
+        "Give me a brief overview of Tesla's business model.",
+        None,
+    ),
+    (
+        "Demo 2: Structured JSON Response",
+        "Get basic information about Microsoft CEO.",
+        {
             "company_name": "string",
             "industry": "string",
             "hq_location": "string",
             "short_description": "string"
-        }
+        },
+    ),
+    (
+        "Demo 3: Contact Information Structure",
+        "Create sample contact info for a VP of Sales at Zoom.",
+        {
+            "full_name": "string",
+            "position": "string",
+            "company": "string",
+            "email": "string"
+        },
+    ),
+)
+
+def build_query(query, fields=None):
+    """Prefix the query with a JSON format request when fields are given"""
+    if fields is None:
+        return query
+    json_request = {"format": "json", "fields": fields}
+    return orjson.dumps(json_request).decode() + "\n\n" + query
+
+async def ask_agent(query):
+    """Run one query through the agent and return its output"""
+    initial_state = {
+        "input": query,
+        "chat_history": [],
+        "agent_outcome": None,
+        "intermediate_steps": []
     }
     
-    query = json.dumps(json_request) + "\n\nGet basic information about Microsoft CEO."
-    print(f"Query: {json.dumps(json_request, indent=2)}")
-    print("Additional context: Get basic information about Microsoft using search engines.")
-    
-    try:
-        initial_state = {
-            "input": query,
-            "chat_history": [],
-            "agent_outcome": None,
-            "intermediate_steps": []
-        }
-        
-        result = await app.ainvoke(initial_state)
-        response = result["agent_outcome"].return_values["output"]
-        
-        print(f"Response: {response}")
-        
-        # Extract JSON from response
-        json_text = extract_json_from_response(response)
-        
-        # Validate JSON structure
-        try:
-            parsed = json.loads(json_text)
-            print("✅ Valid JSON structure!")
-            print("✅ Required fields present:")
-            for field in json_request["fields"]:
-                if isinstance(parsed, dict) and field in parsed:
-                    print(f"  ✅ {field}: {parsed[field]}")
-                else:
-                    print(f"  ❌ Missing: {field}")
-        except json.JSONDecodeError:
-            print("❌ Response is not valid JSON")
-            print(f"Extracted text: {json_text}")
-        except Exception as e:
-            print(f"❌ Error validating JSON: {e}")
-            if isinstance(response, str):
-                print(f"Response is a string, trying to parse directly...")
-                try:
-                    parsed = json.loads(response)
-                    print("✅ Direct parsing successful!")
-                    for field in json_request["fields"]:
-                        if field in parsed:
-                            print(f"  ✅ {field}: {parsed[field]}")
-                        else:
-                            print(f"  ❌ Missing: {field}")
-                except:
-                    print(f"Direct parsing also failed. Raw response: {response[:200]}...")
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    result = await app.ainvoke(initial_state)
+    return result["agent_outcome"].return_values["output"]
 
-async def demo_contact_structure():
-    """Demo: Contact information structure"""
-    print("\n🔍 Demo 3: Contact Information Structure")
+def report_demo(title, query, fields, response):
+    """Print the query, the agent response and, for JSON demos, the field check"""
+    print(f"\n🔍 {title}")
     print("=" * 40)
     
-    json_request = {
-        "format": "json",
-        "fields": {
-            "full_name": "string",
-            "position": "string", 
-            "company": "string",
-            "email": "string"
-        }
-    }
+    if fields is None:
+        print(f"Query: {query}")
+    else:
+        print(f"Query: {json.dumps({'format': 'json', 'fields': fields}, indent=2)}")
+        print(f"Additional context: {query}")
     
-    query = json.dumps(json_request) + "\n\nCreate sample contact info for a VP of Sales at Zoom."
-    print(f"Query: {json.dumps(json_request, indent=2)}")
-    print("Additional context: Create sample contact info for a VP of Sales at Zoom.")
+    if isinstance(response, Exception):
+        print(f"❌ Error: {response}")
+        return
     
+    print(f"Response: {response}")
+    
+    if fields is None:
+        print("✅ Plain text response working correctly!")
+        return
+    
+    # Extract JSON from response and validate its structure
+    json_text = extract_json_from_response(response)
     try:
-        initial_state = {
-            "input": query,
-            "chat_history": [],
-            "agent_outcome": None,
-            "intermediate_steps": []
-        }
-        
-        result = await app.ainvoke(initial_state)
-        response = result["agent_outcome"].return_values["output"]
-        
-        print(f"Response: {response}")
-        
-        # Extract JSON from response
-        json_text = extract_json_from_response(response)
-        
-        # Validate JSON structure
-        try:
-            parsed = json.loads(json_text)
-            print("✅ Valid JSON structure!")
-            print("✅ Contact fields:")
-            for field in json_request["fields"]:
-                if isinstance(parsed, dict) and field in parsed:
-                    print(f"  ✅ {field}: {parsed[field]}")
-                else:
-                    print(f"  ❌ Missing: {field}")
-        except json.JSONDecodeError:
-            print("❌ Response is not valid JSON")
-            print(f"Extracted text: {json_text}")
-        except Exception as e:
-            print(f"❌ Error validating JSON: {e}")
-            if isinstance(response, str):
-                print(f"Response is a string, trying to parse directly...")
-                try:
-                    parsed = json.loads(response)
-                    print("✅ Direct parsing successful!")
-                    for field in json_request["fields"]:
-                        if field in parsed:
-                            print(f"  ✅ {field}: {parsed[field]}")
-                        else:
-                            print(f"  ❌ Missing: {field}")
-                except:
-                    print(f"Direct parsing also failed. Raw response: {response[:200]}...")
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
+        parsed = orjson.loads(json_text)
+    except orjson.JSONDecodeError:
+        print("❌ Response is not valid JSON")
+        print(f"Extracted text: {json_text}")
+        return
+    
+    print("✅ Valid JSON structure!")
+    print("✅ Required fields present:")
+    for field in fields:
+        if isinstance(parsed, dict) and field in parsed:
+            print(f"  ✅ {field}: {parsed[field]}")
+        else:
+            print(f"  ❌ Missing: {field}")
 
-async def main():
+async def run_demos():
     """Run all demos"""
     print("🚀 SDR AI Agent - Working Examples Demo")
     print("=" * 50)
     
-    await demo_plain_text()
-    await demo_structured_json()
-    await demo_contact_structure()
+    # The agent calls are independent, so run them together and report in order
+    responses = await asyncio.gather(
+        *(ask_agent(build_query(query, fields)) for _, query, fields in DEMOS),
+        return_exceptions=True
+    )
+    for (title, query, fields), response in zip(DEMOS, responses):
+        report_demo(title, query, fields, response)
     
     print("\n🎯 Demo completed!")
     print("\nKey Features Demonstrated:")
@@ -206,5 +152,12 @@ async def main():
     print("✅ Proper field validation and type handling")
     print("✅ Clean JSON output (no markdown code blocks)")
 
+async def main():
+    """Run all demos, then shut down the shared MCP session"""
+    try:
+        await run_demos()
+    finally:
+        await app.aclose()
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Run all SDR AI Agent test suites in one process
+Sharing one event loop keeps the agent and its BrightData MCP session warm across suites
+"""
+
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.agent import app
+from test_agent import ComprehensiveAgentTester
+import demo_examples
+from sdr_examples import demo_sdr_workflows
+
+async def main():
+    """Run every suite on the same event loop"""
+    try:
+        # Suites run one after another so their reports stay readable; each one
+        # already runs its own agent queries concurrently
+        await ComprehensiveAgentTester().run_comprehensive_tests()
+        await demo_examples.run_demos()
+        await demo_sdr_workflows()
+        # Imported here: main.setup_langsmith() turns tracing on for the whole
+        # process at import time, which must not affect the suites above
+        from test_langsmith_tracing import test_langsmith_tracing
+        await test_langsmith_tracing()
+    finally:
+        await app.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,13 +5,9 @@ Test script to verify LangSmith tracing is working properly
 import asyncio
 import os
 from datetime import datetime
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# Import the main app
-from main import setup_langsmith, process_single_query
+# Import the main app; importing the agent also loads .env
+from main import app, setup_langsmith, process_single_query
 
 async def test_langsmith_tracing():
     """Test that LangSmith tracing is properly configured and working"""
@@ -49,5 +45,12 @@ async def test_langsmith_tracing():
     print("🎉 LangSmith tracing test completed!")
     print("Check your LangSmith dashboard to see the traced runs.")
 
+async def main():
+    """Run the tracing check, then shut down the shared MCP session"""
+    try:
+        await test_langsmith_tracing()
+    finally:
+        await app.aclose()
+
 if __name__ == "__main__":
-    asyncio.run(test_langsmith_tracing())
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file